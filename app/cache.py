@@ -0,0 +1,38 @@
+"""
+Small in-process TTL cache for slow-changing, read-mostly lookups (e.g. the issuer list).
+
+- cached(ttl): decorator for functions taking a DB session first; the session is not part
+  of the key, so results are shared across requests. Call fn.cache_clear() after writes.
+
+The cache is per process: with several workers each keeps its own copy for up to `ttl` seconds.
+Cached values should be immutable (tuples / Row objects), never session-bound ORM instances.
+"""
+
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+def cached(ttl: float) -> Callable:
+    def decorator(fn: Callable) -> Callable:
+        lock = threading.Lock()
+        store: Dict[Tuple, Tuple[float, Any]] = {}
+
+        @functools.wraps(fn)
+        def wrapper(db, *args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            hit = store.get(key)
+            if hit is not None and hit[0] > time.monotonic():
+                return hit[1]
+            value = fn(db, *args, **kwargs)
+            with lock:
+                store[key] = (time.monotonic() + ttl, value)
+            return value
+
+        def cache_clear() -> None:
+            with lock:
+                store.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
@@ -1,35 +1,102 @@
+import os
+from bisect import bisect_right
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import and_, or_, insert
+from typing import List, Optional, Tuple
 from . import models, schemas
-from datetime import datetime
+from .cache import cached
+from .database import dialect_insert
+from .features import invalidate_feature_cache
+from datetime import date, datetime
+
+# List getters use keyset pagination: pass the sort key + id of the last row of the
+# previous page (after_ts / after_date, after_id) instead of an offset, so the DB seeks
+# straight to the next page rather than scanning and discarding OFFSET rows. The redundant
+# "<=" bound next to each OR lets the planner turn the cursor into an index range seek.
+
+ISSUER_CACHE_TTL = int(os.getenv("ISSUER_CACHE_TTL_SECONDS", 60))
 
 # ---- Issuers & Fundamentals (same as Day1) ----
-def get_issuers(db: Session, skip: int = 0, limit: int = 100) -> List[models.Issuer]:
-    return db.query(models.Issuer).offset(skip).limit(limit).all()
+@cached(ttl=ISSUER_CACHE_TTL)
+def get_all_issuers(db: Session) -> Tuple:
+    """
+    Every issuer as immutable (id, name, ticker, country) rows ordered by id, cached in-process.
+    Issuers are few and rarely change; create_issuer clears the cache.
+    """
+    I = models.Issuer
+    return tuple(db.query(I.id, I.name, I.ticker, I.country).order_by(I.id).all())
+
+def get_issuers(db: Session, limit: int = 100, after_id: Optional[int] = None):
+    issuers = get_all_issuers(db)
+    start = 0
+    if after_id is not None:
+        start = bisect_right(issuers, after_id, key=lambda iss: iss.id)
+    return list(issuers[start:start + limit])
 
 def create_issuer(db: Session, issuer: schemas.IssuerCreate) -> models.Issuer:
     db_obj = models.Issuer(**issuer.model_dump())
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    get_all_issuers.cache_clear()
     return db_obj
 
-def get_fundamentals(db: Session, skip: int = 0, limit: int = 100, issuer_id: Optional[int] = None):
-    q = db.query(models.Fundamental)
+def get_fundamentals(db: Session, limit: int = 100, issuer_id: Optional[int] = None,
+                     after_date: Optional[date] = None, after_id: Optional[int] = None):
+    F = models.Fundamental
+    q = db.query(F)
     if issuer_id is not None:
-        q = q.filter(models.Fundamental.issuer_id == issuer_id)
-    return q.order_by(models.Fundamental.report_date.desc()).offset(skip).limit(limit).all()
+        q = q.filter(F.issuer_id == issuer_id)
+    if after_date is not None:
+        if after_id is not None:
+            q = q.filter(F.report_date <= after_date, or_(F.report_date < after_date, and_(F.report_date == after_date, F.id < after_id)))
+        else:
+            q = q.filter(F.report_date < after_date)
+    return q.order_by(F.report_date.desc(), F.id.desc()).limit(limit).all()
 
 def create_fundamental(db: Session, fundamental: schemas.FundamentalCreate) -> models.Fundamental:
     db_obj = models.Fundamental(**fundamental.model_dump())
     db.add(db_obj)
+    invalidate_feature_cache(db, db_obj.issuer_id)
     db.commit()
     db.refresh(db_obj)
     return db_obj
 
+# ---- BULK ----
+def bulk_insert_ignore(db: Session, model, rows: List[dict], chunk_size: int = 500) -> int:
+    """
+    Insert rows, letting the DB's unique constraints drop duplicates (ON CONFLICT DO NOTHING
+    on SQLite / PostgreSQL, INSERT IGNORE on MySQL) so no existence SELECT is needed.
+    Returns the number of rows actually inserted; caller commits.
+    """
+    inserted = 0
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        stmt = dialect_insert(db, model)
+        if stmt is not None:
+            stmt = stmt.values(chunk).on_conflict_do_nothing()
+        else:
+            stmt = insert(model).values(chunk)
+            if db.get_bind().dialect.name in ("mysql", "mariadb"):
+                stmt = stmt.prefix_with("IGNORE")
+        inserted += db.execute(stmt).rowcount
+    return inserted
+
 # ---- NEWS ----
-def get_news(db: Session, skip: int = 0, limit: int = 100) -> List[models.News]:
-    return db.query(models.News).order_by(models.News.published_at.desc().nullslast()).offset(skip).limit(limit).all()
+def get_news(db: Session, limit: int = 100, after_ts: Optional[datetime] = None,
+             after_id: Optional[int] = None) -> List[models.News]:
+    N = models.News
+    q = db.query(N)
+    if after_ts is not None:
+        # undated news sorts last, so it always follows a dated cursor
+        cond = [N.published_at < after_ts, N.published_at.is_(None)]
+        if after_id is not None:
+            cond.append(and_(N.published_at == after_ts, N.id < after_id))
+        q = q.filter(or_(*cond))
+    elif after_id is not None:
+        # cursor row was undated: only undated rows remain
+        q = q.filter(N.published_at.is_(None), N.id < after_id)
+    return q.order_by(N.published_at.desc().nullslast(), N.id.desc()).limit(limit).all()
 
 def get_news_by_link(db: Session, link: str) -> Optional[models.News]:
     return db.query(models.News).filter(models.News.link == link).first()
@@ -42,17 +109,25 @@ def create_news(db: Session, news: schemas.NewsCreate) -> models.News:
     return db_obj
 
 # ---- EVENTS ----
-def get_events(db: Session, skip: int = 0, limit: int = 100, issuer_id: Optional[int] = None):
-    q = db.query(models.Event)
+def get_events(db: Session, limit: int = 100, issuer_id: Optional[int] = None,
+               after_ts: Optional[datetime] = None, after_id: Optional[int] = None):
+    E = models.Event
+    q = db.query(E)
     if issuer_id is not None:
-        q = q.filter(models.Event.issuer_id == issuer_id)
-    return q.order_by(models.Event.timestamp.desc()).offset(skip).limit(limit).all()
+        q = q.filter(E.issuer_id == issuer_id)
+    if after_ts is not None:
+        if after_id is not None:
+            q = q.filter(E.timestamp <= after_ts, or_(E.timestamp < after_ts, and_(E.timestamp == after_ts, E.id < after_id)))
+        else:
+            q = q.filter(E.timestamp < after_ts)
+    return q.order_by(E.timestamp.desc(), E.id.desc()).limit(limit).all()
 
 def create_event(db: Session, e: schemas.EventCreate) -> models.Event:
     payload = e.model_dump()
-    # if timestamp is None, SQL default applies
+    # if timestamp is None, the model's UTC-now default applies
     db_obj = models.Event(**payload)
     db.add(db_obj)
+    invalidate_feature_cache(db, db_obj.issuer_id)
     db.commit()
     db.refresh(db_obj)
     return db_obj
@@ -1,18 +1,137 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event, inspect, delete, func, select, update
+from sqlalchemy.orm import sessionmaker, declarative_base, configure_mappers
 import os
 from typing import Generator
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./credit.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-)
+if DATABASE_URL.startswith("sqlite"):
+    # file DBs keep SQLAlchemy's default QueuePool; WAL (below) lets pooled readers run alongside the writer
+    engine_kwargs = {"connect_args": {"check_same_thread": False}}
+else:
+    # sized for FastAPI's sync threadpool (40 threads) plus the ingestion thread;
+    # pre_ping/recycle drop connections the server closed while idle
+    engine_kwargs = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 20)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 40)),
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+    }
+
+engine = create_engine(DATABASE_URL, **engine_kwargs)
+
+if DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, _record):
+        # WAL: readers don't block behind the ingest writer and commits skip the rollback-journal fsync;
+        # synchronous=NORMAL is durable under WAL except for power loss of the last transactions
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+        cur.execute("PRAGMA cache_size=-65536")    # 64 MiB
+        cur.close()
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 Base = declarative_base()
 
+# Bump whenever the schema changes so existing SQLite files re-run init_db's upgrade on next start.
+# create_all / _sync_indexes only add missing tables and indexes: a new column or constraint on an
+# existing table needs its own explicit migration step in init_db.
+SCHEMA_VERSION = 7
+
+# (table, index) pairs the models no longer declare; dropped from existing databases on upgrade
+OBSOLETE_INDEXES = [
+    ("fundamentals", "ix_fundamentals_issuer_id"),
+    ("events", "ix_events_issuer_id"),
+]
+
+def _sync_indexes(conn) -> None:
+    """
+    create_all only creates indexes together with a new table; add the ones declared since
+    on existing tables and drop the ones listed in OBSOLETE_INDEXES.
+    """
+    insp = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {ix["name"] for ix in insp.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=conn)
+    for table_name, index_name in OBSOLETE_INDEXES:
+        if index_name in {ix["name"] for ix in insp.get_indexes(table_name)}:
+            conn.exec_driver_sql(f"DROP INDEX {index_name}" if conn.dialect.name != "mysql"
+                                 else f"DROP INDEX {index_name} ON {table_name}")
+
+def _upgrade_events_bucket_day(conn) -> None:
+    """
+    Add events.bucket_day and uq_event_issuer_type_day to an events table created before them.
+    Existing price rows get their UTC day backfilled, and same-day duplicates (keeping the
+    lowest id) are removed so the unique index can be built and old days conflict on re-ingest.
+    """
+    if "bucket_day" in {c["name"] for c in inspect(conn).get_columns("events")}:
+        return
+    E = Base.metadata.tables["events"]
+    conn.exec_driver_sql("ALTER TABLE events ADD COLUMN bucket_day DATE")
+    conn.execute(update(E).where(E.c.event_type == "price").values(bucket_day=func.date(E.c.timestamp)))
+    keep = (
+        select(func.min(E.c.id).label("id"))
+        .where(E.c.bucket_day.isnot(None))
+        .group_by(E.c.issuer_id, E.c.event_type, E.c.bucket_day)
+        .subquery("keep")
+    )
+    conn.execute(delete(E).where(E.c.bucket_day.isnot(None), E.c.id.notin_(select(keep.c.id))))
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX uq_event_issuer_type_day ON events (issuer_id, event_type, bucket_day)"
+    )
+
+def _normalize_sqlite_event_timestamps(conn) -> None:
+    """
+    Rows that took SQLite's CURRENT_TIMESTAMP default are stored as 'YYYY-MM-DD HH:MM:SS',
+    while bound datetimes are stored with '.ffffff'; as text the two never compare equal,
+    which breaks the events keyset cursor. Rewrite the old rows to the bound format.
+    """
+    conn.exec_driver_sql(
+        "UPDATE events SET timestamp = timestamp || '.000000' WHERE length(timestamp) = 19"
+    )
+
+def init_db() -> None:
+    """
+    Create missing tables and apply the upgrade steps above. On SQLite this is skipped when
+    PRAGMA user_version already matches SCHEMA_VERSION, so restarts don't re-inspect every table.
+    """
+    from . import models  # noqa: F401  (registers all tables on Base.metadata)
+    # resolve relationships now rather than inside the first request's query
+    configure_mappers()
+    if engine.dialect.name != "sqlite":
+        with engine.begin() as conn:
+            Base.metadata.create_all(bind=conn)
+            _upgrade_events_bucket_day(conn)
+            _sync_indexes(conn)
+        return
+    with engine.begin() as conn:
+        if conn.exec_driver_sql("PRAGMA user_version").scalar() >= SCHEMA_VERSION:
+            return
+        Base.metadata.create_all(bind=conn)
+        _upgrade_events_bucket_day(conn)
+        _normalize_sqlite_event_timestamps(conn)
+        _sync_indexes(conn)
+        conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+def dialect_insert(db, model):
+    """
+    The dialect's own insert() construct (with on_conflict_* support) for SQLite / PostgreSQL,
+    or None for other backends.
+    """
+    name = db.get_bind().dialect.name
+    if name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert(model)
+
 def get_db() -> Generator:
     db = SessionLocal()
     try:
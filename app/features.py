@@ -9,13 +9,18 @@ and recent NLP sentiment events:
 - avg_sentiment: average sentiment from events associated with issuer (last N)
 - recent_revenue: latest revenue (raw)
 - recent_total_debt: latest total_debt (raw)
+
+Computed features are materialized in issuer_feature_cache: ingestion refreshes the
+issuers it touched, manual writes invalidate, and readers use get_cached_features.
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterable
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timezone
 import math
 from . import models
+from .database import dialect_insert
 
 EPS = 1e-6
 
@@ -27,27 +32,24 @@ def _safe_div(a: Optional[float], b: Optional[float]) -> float:
     except Exception:
         return 0.0
 
-def compute_features_for_issuer(db: Session, issuer_id: int) -> Dict[str, Any]:
-    """
-    Compute features for the given issuer_id using the latest two fundamentals and recent events.
-    Returns feature dict in deterministic order.
-    """
-    # fetch fundamentals ordered by report_date desc
-    f_rows = db.query(models.Fundamental).filter(models.Fundamental.issuer_id == issuer_id).order_by(models.Fundamental.report_date.desc()).limit(5).all()
-    if not f_rows:
-        # return a default zeroed feature vector
-        return {
-            "debt_to_ebitda": 0.0,
-            "ebitda_margin": 0.0,
-            "revenue_growth": 0.0,
-            "avg_sentiment": 0.0,
-            "recent_revenue": 0.0,
-            "recent_total_debt": 0.0,
-        }
+# how many recent fundamentals / events feed the features
+N_FUNDAMENTALS = 2
+N_EVENTS = 10
 
-    latest = f_rows[0]
-    prev = f_rows[1] if len(f_rows) > 1 else None
+def _zero_features() -> Dict[str, Any]:
+    return {
+        "debt_to_ebitda": 0.0,
+        "ebitda_margin": 0.0,
+        "revenue_growth": 0.0,
+        "avg_sentiment": 0.0,
+        "recent_revenue": 0.0,
+        "recent_total_debt": 0.0,
+    }
 
+def _build_features(latest, prev, avg_sentiment: Optional[float]) -> Dict[str, Any]:
+    """
+    latest / prev: rows with total_debt, ebitda, revenue (prev may be None).
+    """
     # debt_to_ebitda
     debt = latest.total_debt or 0.0
     ebitda = latest.ebitda or 0.0
@@ -64,17 +66,107 @@ def compute_features_for_issuer(db: Session, issuer_id: int) -> Dict[str, Any]:
     else:
         revenue_growth = 0.0
 
-    # sentiment: average of last N events for this issuer (or linked news)
-    events = db.query(models.Event).filter(models.Event.issuer_id == issuer_id).order_by(models.Event.timestamp.desc()).limit(10).all()
-    sentiments = [e.sentiment for e in events if e.sentiment is not None]
-    avg_sentiment = sum(sentiments) / len(sentiments) if sentiments else 0.0
-
     feats = {
         "debt_to_ebitda": float(debt_to_ebitda),
         "ebitda_margin": float(ebitda_margin),
         "revenue_growth": float(revenue_growth),
-        "avg_sentiment": float(avg_sentiment),
+        "avg_sentiment": float(avg_sentiment or 0.0),
         "recent_revenue": float(revenue),
         "recent_total_debt": float(debt),
     }
     return feats
+
+def compute_features_for_issuer(db: Session, issuer_id: int) -> Dict[str, Any]:
+    """
+    Compute features for the given issuer_id using the latest two fundamentals and recent events.
+    Returns feature dict in deterministic order.
+    """
+    # fetch latest two fundamentals (only the columns we use) ordered by report_date desc
+    F = models.Fundamental
+    f_rows = db.query(F.total_debt, F.ebitda, F.revenue).filter(F.issuer_id == issuer_id).order_by(F.report_date.desc(), F.id.desc()).limit(N_FUNDAMENTALS).all()
+    if not f_rows:
+        # return a default zeroed feature vector
+        return _zero_features()
+
+    latest = f_rows[0]
+    prev = f_rows[1] if len(f_rows) > 1 else None
+
+    # sentiment: average of last N events for this issuer (or linked news);
+    # AVG runs in the DB over the last-N subquery (NULL sentiments are skipped)
+    last_events = db.query(models.Event.sentiment).filter(models.Event.issuer_id == issuer_id).order_by(models.Event.timestamp.desc(), models.Event.id.desc()).limit(N_EVENTS).subquery()
+    avg_sentiment = db.query(func.avg(last_events.c.sentiment)).scalar()
+
+    return _build_features(latest, prev, avg_sentiment)
+
+def compute_features_for_many_issuers(db: Session, issuer_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Batched form of compute_features_for_issuer: two queries in total instead of two per issuer.
+    Each query ranks rows per issuer with ROW_NUMBER() so only the latest N per issuer come back.
+    Returns {issuer_id: feats}; issuers without fundamentals get the zeroed vector.
+    """
+    issuer_ids = list(dict.fromkeys(issuer_ids))
+    if not issuer_ids:
+        return {}
+    F, E = models.Fundamental, models.Event
+
+    f_rank = func.row_number().over(partition_by=F.issuer_id, order_by=(F.report_date.desc(), F.id.desc())).label("rn")
+    f_sub = db.query(F.issuer_id, F.total_debt, F.ebitda, F.revenue, f_rank).filter(F.issuer_id.in_(issuer_ids)).subquery()
+    fundamentals: Dict[int, list] = {}
+    for r in db.query(f_sub).filter(f_sub.c.rn <= N_FUNDAMENTALS).order_by(f_sub.c.issuer_id, f_sub.c.rn).all():
+        fundamentals.setdefault(r.issuer_id, []).append(r)
+
+    e_rank = func.row_number().over(partition_by=E.issuer_id, order_by=(E.timestamp.desc(), E.id.desc())).label("rn")
+    e_sub = db.query(E.issuer_id, E.sentiment, e_rank).filter(E.issuer_id.in_(issuer_ids)).subquery()
+    avg_sentiments = dict(
+        db.query(e_sub.c.issuer_id, func.avg(e_sub.c.sentiment)).filter(e_sub.c.rn <= N_EVENTS).group_by(e_sub.c.issuer_id).all()
+    )
+
+    out = {}
+    for issuer_id in issuer_ids:
+        f_rows = fundamentals.get(issuer_id)
+        if not f_rows:
+            out[issuer_id] = _zero_features()
+            continue
+        prev = f_rows[1] if len(f_rows) > 1 else None
+        out[issuer_id] = _build_features(f_rows[0], prev, avg_sentiments.get(issuer_id))
+    return out
+
+def _upsert_feature_cache(db: Session, issuer_id: int, feats: Dict[str, Any]) -> None:
+    stmt = dialect_insert(db, models.IssuerFeatureCache)
+    if stmt is None:
+        db.merge(models.IssuerFeatureCache(issuer_id=issuer_id, feats=feats))
+        return
+    stmt = stmt.values(issuer_id=issuer_id, feats=feats)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.IssuerFeatureCache.issuer_id],
+        set_={"feats": stmt.excluded.feats, "updated_at": datetime.now(timezone.utc)},
+    )
+    db.execute(stmt)
+
+def refresh_feature_cache(db: Session, issuer_ids: Iterable[int]) -> int:
+    """
+    Recompute and upsert cached features for the given issuers. Returns count refreshed.
+    """
+    feats_by_issuer = compute_features_for_many_issuers(db, issuer_ids)
+    for issuer_id, feats in feats_by_issuer.items():
+        _upsert_feature_cache(db, issuer_id, feats)
+    if feats_by_issuer:
+        db.commit()
+    return len(feats_by_issuer)
+
+def invalidate_feature_cache(db: Session, issuer_id: Optional[int]) -> None:
+    """Drop the cached row so the next read recomputes it (caller commits)."""
+    if issuer_id is not None:
+        db.query(models.IssuerFeatureCache).filter(models.IssuerFeatureCache.issuer_id == issuer_id).delete()
+
+def get_cached_features(db: Session, issuer_id: int) -> Dict[str, Any]:
+    """
+    Single primary-key lookup in issuer_feature_cache; computes and stores on a miss.
+    """
+    row = db.get(models.IssuerFeatureCache, issuer_id)
+    if row is not None:
+        return dict(row.feats)
+    feats = compute_features_for_issuer(db, issuer_id)
+    _upsert_feature_cache(db, issuer_id, feats)
+    db.commit()
+    return feats
@@ -1,10 +1,15 @@
 import feedparser
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from dateutil import parser as date_parser
-from .nlp import classify_event, analyze_sentiment
+from .nlp import classify_event, analyze_sentiment_batch
+from .features import refresh_feature_cache
 from . import crud, models
 from sqlalchemy.orm import Session
 import logging
+import ahocorasick
+import pandas as pd
 import yfinance as yf
 import json
 from typing import List, Optional
@@ -12,6 +17,9 @@ from sqlalchemy import func
 
 logger = logging.getLogger(__name__)
 
+# max concurrent feed downloads per ingest_rss call
+RSS_FETCH_WORKERS = int(os.getenv("RSS_FETCH_WORKERS", 8))
+
 # Configure RSS feeds (example list; add more as needed)
 RSS_FEEDS = [
     "https://www.reuters.com/markets/us/rss",    # Reuters markets
@@ -20,41 +28,90 @@ RSS_FEEDS = [
     # Add or replace feeds appropriate to your project (ensure allowed by license)
 ]
 
+def _entry_to_news(entry) -> Optional[dict]:
+    """Map a feedparser entry to News column values; None if link or title is missing."""
+    link = getattr(entry, "link", None)
+    title = getattr(entry, "title", None)
+    # Skip if link or title missing
+    if not link or not title:
+        return None
+    summary = getattr(entry, "summary", None) or getattr(entry, "description", None)
+    published = None
+    # feedparser already parsed the date into a UTC struct_time; dateutil only as a fallback
+    parsed = getattr(entry, "published_parsed", None)
+    if parsed:
+        published = datetime(*parsed[:6], tzinfo=timezone.utc)
+    elif hasattr(entry, "published"):
+        try:
+            published = date_parser.parse(entry.published)
+            if published.tzinfo is None:
+                published = published.replace(tzinfo=timezone.utc)
+        except Exception:
+            published = None
+    return {
+        "title": title.strip(),
+        "link": link.strip(),
+        "summary": summary,
+        "published_at": published,
+    }
+
 # Ingest RSS news
 def ingest_rss(db: Session, feeds: Optional[List[str]] = None) -> int:
+    """
+    Fetch each feed with a conditional GET (ETag / If-Modified-Since from feed_cache);
+    feeds answering 304 Not Modified are skipped without parsing any entries.
+    Feeds are fetched and parsed concurrently in a thread pool; all DB work stays on the
+    calling thread. Duplicate links are dropped by the DB on insert; one commit per run.
+    """
     feeds = feeds or RSS_FEEDS
-    inserted = 0
+    if not feeds:
+        return 0
+    cache = {c.url: c for c in db.query(models.FeedCache).filter(models.FeedCache.url.in_(feeds)).all()}
+
+    # feedparser already sends Accept-Encoding: gzip, deflate
+    parsed = {}
+    with ThreadPoolExecutor(max_workers=min(len(feeds), RSS_FETCH_WORKERS), thread_name_prefix="rss") as pool:
+        futures = {
+            pool.submit(
+                feedparser.parse,
+                url,
+                etag=cache[url].etag if url in cache else None,
+                modified=cache[url].modified if url in cache else None,
+            ): url
+            for url in feeds
+        }
+        for fut in as_completed(futures):
+            url = futures[fut]
+            try:
+                parsed[url] = fut.result()
+            except Exception as e:
+                logger.exception("RSS ingest error for %s: %s", url, e)
+
+    # feed order is kept so the first feed to carry a link wins
+    rows = []
     for url in feeds:
+        d = parsed.get(url)
+        if d is None:
+            continue
+        if getattr(d, "status", None) == 304:
+            logger.debug("RSS feed not modified: %s", url)
+            continue
         try:
-            d = feedparser.parse(url)
-            for entry in d.entries:
-                link = getattr(entry, "link", None)
-                title = getattr(entry, "title", None)
-                summary = getattr(entry, "summary", None) or getattr(entry, "description", None, None)
-                published = None
-                if hasattr(entry, "published"):
-                    try:
-                        published = date_parser.parse(entry.published)
-                        if published.tzinfo is None:
-                            published = published.replace(tzinfo=timezone.utc)
-                    except Exception:
-                        published = None
-                # Skip if link or title missing
-                if not link or not title:
-                    continue
-                # dedupe by link
-                existing = crud.get_news_by_link(db, link)
-                if existing:
-                    continue
-                n = crud.create_news(db, models.News(
-                    title=title.strip(),
-                    link=link.strip(),
-                    summary=summary,
-                    published_at=published
-                ))
-                inserted += 1
+            rows.extend(item for item in map(_entry_to_news, d.entries) if item)
         except Exception as e:
             logger.exception("RSS ingest error for %s: %s", url, e)
+            continue
+        etag, modified = d.get("etag"), d.get("modified")
+        if etag or modified:
+            cached = cache.get(url)
+            if cached is None:
+                cached = cache[url] = models.FeedCache(url=url)
+                db.add(cached)
+            cached.etag, cached.modified = etag, modified
+
+    # dedupe by link via the unique constraint on news.link: no existence SELECT
+    inserted = crud.bulk_insert_ignore(db, models.News, rows) if rows else 0
+    db.commit()
     logger.info("RSS ingest completed, inserted=%d", inserted)
     return inserted
 
@@ -63,62 +120,93 @@ def ingest_yahoo_prices(db: Session, period: str = "7d", interval: str = "1d") -
     """
     For each issuer that has a ticker, fetch history and create price events for new rows.
     Stores event with event_type='price' and extra={'close':..,'open':..,'volume':..}
+    At most one price event is kept per issuer per UTC day (bucket_day): all rows go in one
+    bulk insert and the unique constraint drops days that already exist.
     """
-    inserted = 0
-    issuers = db.query(models.Issuer).filter(models.Issuer.ticker.isnot(None)).all()
+    # lightweight cached (id, name, ticker, country) rows, not ORM instances
+    issuers = [iss for iss in crud.get_all_issuers(db) if iss.ticker and iss.ticker.strip()]
+    if not issuers:
+        logger.info("Yahoo price ingest completed, inserted=0")
+        return 0
+    # one batched download for every ticker instead of one request per issuer;
+    # yf.download upper-cases tickers for its column keys, so we key on the upper-cased form too
+    tickers = sorted({iss.ticker.strip().upper() for iss in issuers})
+    try:
+        # auto_adjust / ignore_tz override download()'s defaults so each frame matches what
+        # Ticker.history() returned: adjusted OHLC, exchange-tz-aware timestamps
+        data = yf.download(" ".join(tickers), period=period, interval=interval,
+                           group_by="ticker", threads=True, progress=False,
+                           auto_adjust=True, ignore_tz=False)
+    except Exception as e:
+        logger.exception("Error downloading prices for %s: %s", tickers, e)
+        return 0
+    # (issuer_id, day) -> candidate row; first row of a day wins
+    candidates = {}
     for issuer in issuers:
         ticker = issuer.ticker.strip()
-        if not ticker:
-            continue
         try:
-            tk = yf.Ticker(ticker)
-            hist = tk.history(period=period, interval=interval)
+            hist = _ticker_frame(data, ticker.upper(), len(tickers))
             # DataFrame may be empty
             if hist is None or hist.empty:
                 continue
-            # iterate rows
-            for ts, row in hist.iterrows():
-                # ts may be Timestamp; convert to aware datetime (UTC)
-                ts_utc = pd_timestamp_to_datetime(ts)
-                # check duplicate event for this issuer and timestamp
-                exists = db.query(models.Event).filter(
-                    models.Event.issuer_id == issuer.id,
-                    func.strftime('%Y-%m-%dT%H:%M:%fZ', models.Event.timestamp) == ts_utc.isoformat()
-                ).first()
-                # Simpler dedupe: check any event with issuer_id and event_type='price' and timestamp within same day
-                exists2 = db.query(models.Event).filter(
-                    models.Event.issuer_id == issuer.id,
-                    models.Event.event_type == 'price',
-                    func.date(models.Event.timestamp) == ts_utc.date()
-                ).first()
-                if exists or exists2:
+            # itertuples is much cheaper than iterrows (no Series per row)
+            for row in hist.itertuples():
+                # row.Index may be Timestamp; convert to aware datetime (UTC)
+                ts_utc = pd_timestamp_to_datetime(row.Index)
+                key = (issuer.id, ts_utc.date())
+                if key in candidates:
                     continue
+                volume = getattr(row, "Volume", None)
                 extra = {
-                    "open": float(row.get("Open", None)) if row.get("Open", None) is not None else None,
-                    "high": float(row.get("High", None)) if row.get("High", None) is not None else None,
-                    "low": float(row.get("Low", None)) if row.get("Low", None) is not None else None,
-                    "close": float(row.get("Close", None)) if row.get("Close", None) is not None else None,
-                    "volume": int(row.get("Volume", 0)) if row.get("Volume", None) is not None else None,
+                    "open": _opt_float(getattr(row, "Open", None)),
+                    "high": _opt_float(getattr(row, "High", None)),
+                    "low": _opt_float(getattr(row, "Low", None)),
+                    "close": _opt_float(getattr(row, "Close", None)),
+                    "volume": int(volume) if volume is not None and pd.notna(volume) else None,
+                }
+                candidates[key] = {
+                    "issuer_id": issuer.id,
+                    "news_id": None,
+                    "event_type": "price",
+                    "description": f"Price snapshot for {ticker} at {ts_utc.isoformat()}",
+                    "sentiment": None,
+                    "timestamp": ts_utc,
+                    "extra": extra,
+                    "bucket_day": ts_utc.date(),
                 }
-                # create price event
-                e = models.Event(
-                    issuer_id=issuer.id,
-                    news_id=None,
-                    event_type="price",
-                    description=f"Price snapshot for {ticker} at {ts_utc.isoformat()}",
-                    sentiment=None,
-                    timestamp=ts_utc,
-                    extra=extra
-                )
-                db.add(e)
-                db.commit()
-                db.refresh(e)
-                inserted += 1
         except Exception as e:
             logger.exception("Error ingesting prices for %s (%s): %s", issuer.name, issuer.ticker, e)
+    if not candidates:
+        logger.info("Yahoo price ingest completed, inserted=0")
+        return 0
+    # duplicates (issuer, 'price', day) are dropped by uq_event_issuer_type_day on insert
+    inserted = crud.bulk_insert_ignore(db, models.Event, list(candidates.values()))
+    db.commit()
     logger.info("Yahoo price ingest completed, inserted=%d", inserted)
     return inserted
 
+def _ticker_frame(data, ticker: str, n_tickers: int):
+    """
+    Slice one ticker's OHLCV frame out of a yf.download(group_by="ticker") result.
+    Columns are (ticker, field) for multi-ticker downloads; older yfinance returns flat
+    columns for a single ticker. Rows that are all-NaN (days only other tickers traded) are dropped.
+    """
+    if data is None or data.empty:
+        return None
+    if getattr(data.columns, "nlevels", 1) > 1:
+        if ticker not in data.columns.get_level_values(0):
+            return None
+        hist = data[ticker]
+    elif n_tickers == 1:
+        hist = data
+    else:
+        return None
+    return hist.dropna(how="all")
+
+def _opt_float(v) -> Optional[float]:
+    # batched downloads leave NaN cells where a ticker is missing one field for a day
+    return float(v) if v is not None and pd.notna(v) else None
+
 # small helper to convert pandas Timestamp / datetime-like to timezone-aware datetime in UTC
 def pd_timestamp_to_datetime(ts):
     try:
@@ -138,27 +226,73 @@ def pd_timestamp_to_datetime(ts):
         return ts.astimezone(timezone.utc)
     return datetime.now(timezone.utc)
 
+# Issuer matching: one Aho-Corasick automaton over lowercase tickers and names, so each
+# title is scanned once in O(len(title)) no matter how many issuers exist.
+def build_issuer_matcher(issuers) -> Optional[ahocorasick.Automaton]:
+    """
+    issuers: rows with id, ticker, name. Values stored are (issuer_id, is_ticker, key_len);
+    a ticker wins over a name when both lowercase to the same string.
+    """
+    automaton = ahocorasick.Automaton()
+    for iss in issuers:
+        key = (iss.ticker or "").strip().lower()
+        if key:
+            automaton.add_word(key, (iss.id, True, len(key)))
+    for iss in issuers:
+        key = (iss.name or "").strip().lower()
+        if key and not automaton.exists(key):
+            automaton.add_word(key, (iss.id, False, len(key)))
+    if len(automaton) == 0:
+        return None
+    automaton.make_automaton()
+    return automaton
+
+# matcher for the last issuer tuple seen; crud.get_all_issuers returns the same object until it expires
+_matcher_cache = (None, None)
+
+def _issuer_matcher(issuers) -> Optional[ahocorasick.Automaton]:
+    global _matcher_cache
+    src, matcher = _matcher_cache
+    if src is not issuers:
+        matcher = build_issuer_matcher(issuers)
+        _matcher_cache = (issuers, matcher)
+    return matcher
+
+def match_issuer(matcher: Optional[ahocorasick.Automaton], title_l: str) -> Optional[int]:
+    """
+    Return the issuer_id of the first ticker found as a whole word in title_l,
+    else of the first issuer name found as a substring, else None.
+    """
+    if matcher is None or not title_l:
+        return None
+    name_hit = None
+    for end, (iid, is_ticker, key_len) in matcher.iter(title_l):
+        if not is_ticker:
+            if name_hit is None:
+                name_hit = iid
+            continue
+        # tickers are short; require word boundaries so "bpl" does not match "bplx"
+        start = end - key_len + 1
+        if (start == 0 or not title_l[start - 1].isalnum()) and (end + 1 == len(title_l) or not title_l[end + 1].isalnum()):
+            return iid
+    return name_hit
+
 # Run NLP on unprocessed news, create events
 def run_nlp_on_news(db: Session) -> int:
     inserted = 0
     # get unprocessed news rows
     rows = db.query(models.News).filter(models.News.processed == False).order_by(models.News.published_at.desc().nullslast()).all()
-    for n in rows:
-        text = (n.title or "") + " " + (n.summary or "")
+    if not rows:
+        logger.info("NLP pass completed, events inserted=0")
+        return 0
+    # cached issuer list -> one matcher over their tickers / names (rebuilt only when the list changes)
+    matcher = _issuer_matcher(crud.get_all_issuers(db))
+    texts = [(n.title or "") + " " + (n.summary or "") for n in rows]
+    sentiments = analyze_sentiment_batch(texts)
+    for n, text, sentiment in zip(rows, texts, sentiments):
         event_type = classify_event(text)
-        sentiment = analyze_sentiment(text)
-        # attempt to match issuer by ticker or name present in title
-        issuer_id = None
-        # find issuer by ticker or name substring
-        issuers = db.query(models.Issuer).all()
-        title_l = (n.title or "").lower()
-        for iss in issuers:
-            if iss.ticker and iss.ticker.lower() in title_l:
-                issuer_id = iss.id
-                break
-            if iss.name and iss.name.lower() in title_l:
-                issuer_id = iss.id
-                break
+        # attempt to match issuer by ticker (whole word) or name present in title
+        issuer_id = match_issuer(matcher, (n.title or "").lower())
         # create event linking to the news
         e = models.Event(
             issuer_id=issuer_id,
@@ -172,20 +306,28 @@ def run_nlp_on_news(db: Session) -> int:
         db.add(e)
         # mark news processed
         n.processed = True
-        db.commit()
         inserted += 1
+    db.commit()
     logger.info("NLP pass completed, events inserted=%d", inserted)
     return inserted
 
 # top-level ingestion
 def ingest_all(db: Session) -> dict:
     """
-    Executes RSS ingest, Yahoo price ingest, then runs NLP.
+    Executes RSS ingest, Yahoo price ingest, then runs NLP and refreshes the
+    feature cache for touched issuers.
     Returns counts dict for logging/testing.
     """
+    last_event_id = db.query(func.max(models.Event.id)).scalar() or 0
     inserted_news = ingest_rss(db)
     inserted_prices = ingest_yahoo_prices(db)
     inserted_events = run_nlp_on_news(db)
+    # refresh materialized features for issuers that got new events this run
+    touched = [iid for (iid,) in db.query(models.Event.issuer_id).filter(
+        models.Event.id > last_event_id,
+        models.Event.issuer_id.isnot(None)
+    ).distinct().all()]
+    refresh_feature_cache(db, touched)
     return {
         "news": inserted_news,
         "price_events": inserted_prices,
@@ -1,15 +1,17 @@
 import logging
+from contextlib import asynccontextmanager
+from datetime import date, datetime
 from typing import List, Optional
 
 from fastapi import FastAPI, Depends, Query, HTTPException
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 
-from .database import Base, engine, get_db
+from .database import get_db, init_db, SessionLocal
 from . import schemas, crud, models
 from .seed import seed_if_empty
 from .scheduler import scheduler
-from .ml import train_model_if_needed, predict_and_explain
-from .database import SessionLocal
+from .ml import train_model_if_needed, predict_and_explain, predict_score
 
 # Logging config
 logging.basicConfig(
@@ -18,46 +20,63 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(
-    title="Real-Time Explainable Credit Intelligence Platform — API",
-    version="0.3.0",
-)
-
 # Lifespan
-@app.on_event("startup")
-def on_startup():
-    Base.metadata.create_all(bind=engine)
-    # seed DB if empty
-    with next(get_db()) as db:
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # create tables only when the schema version changed
+    init_db()
+    with SessionLocal() as db:
+        # seed DB if empty, train model if missing
         seed_if_empty(db)
-    # train model if missing
-    try:
-        db = SessionLocal()
         train_model_if_needed(db)
-    finally:
-        db.close()
     # start scheduler
     scheduler.start()
     logger.info("Application started (Day 3)")
-
-@app.on_event("shutdown")
-async def on_shutdown():
+    yield
     await scheduler.stop()
     logger.info("Shutdown finished")
 
+app = FastAPI(
+    title="Real-Time Explainable Credit Intelligence Platform — API",
+    version="0.3.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+
+# Read endpoints keep response_model for the OpenAPI schema but return a prebuilt
+# ORJSONResponse, which FastAPI sends as-is (no per-row pydantic validation/serialization).
+_FIELDS = {
+    schema: tuple(schema.model_fields)
+    for schema in (schemas.IssuerRead, schemas.FundamentalRead, schemas.NewsRead, schemas.EventRead)
+}
+
+def _rows_response(rows, schema) -> ORJSONResponse:
+    fields = _FIELDS[schema]
+    return ORJSONResponse([{f: getattr(r, f) for f in fields} for r in rows])
+
+def _require_cursor_key(after_id, key, key_name: str) -> None:
+    # after_id only breaks ties within one sort key; on its own it would silently restart at page 1
+    if after_id is not None and key is None:
+        raise HTTPException(status_code=400, detail=f"after_id requires {key_name}")
+
 # --- existing endpoints remain (issuers, fundamentals, news, events) ---
+# Listings are keyset-paginated: pass the id (and date/timestamp) of the last row you got
+# as after_id / after_date / after_ts to fetch the next page.
 @app.get("/issuers", response_model=List[schemas.IssuerRead], summary="List issuers")
-def list_issuers(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
-    return crud.get_issuers(db, skip=skip, limit=limit)
+def list_issuers(after_id: Optional[int] = Query(None), limit: int = Query(100, ge=1, le=1000),
+                 db: Session = Depends(get_db)):
+    return _rows_response(crud.get_issuers(db, limit=limit, after_id=after_id), schemas.IssuerRead)
 
 @app.post("/issuers", response_model=schemas.IssuerRead, status_code=201)
 def create_issuer(issuer: schemas.IssuerCreate, db: Session = Depends(get_db)):
     return crud.create_issuer(db, issuer)
 
 @app.get("/fundamentals", response_model=List[schemas.FundamentalRead], summary="List fundamentals")
-def list_fundamentals(issuer_id: Optional[int] = Query(None), skip: int = Query(0, ge=0),
-                      limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
-    return crud.get_fundamentals(db, skip=skip, limit=limit, issuer_id=issuer_id)
+def list_fundamentals(issuer_id: Optional[int] = Query(None), after_date: Optional[date] = Query(None),
+                      after_id: Optional[int] = Query(None), limit: int = Query(100, ge=1, le=1000),
+                      db: Session = Depends(get_db)):
+    _require_cursor_key(after_id, after_date, "after_date")
+    return _rows_response(crud.get_fundamentals(db, limit=limit, issuer_id=issuer_id, after_date=after_date, after_id=after_id), schemas.FundamentalRead)
 
 @app.post("/fundamentals", response_model=schemas.FundamentalRead, status_code=201)
 def create_fundamental(f: schemas.FundamentalCreate, db: Session = Depends(get_db)):
@@ -67,8 +86,9 @@ def create_fundamental(f: schemas.FundamentalCreate, db: Session = Depends(get_d
     return crud.create_fundamental(db, f)
 
 @app.get("/news", response_model=List[schemas.NewsRead], summary="List news")
-def list_news(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
-    return crud.get_news(db, skip=skip, limit=limit)
+def list_news(after_ts: Optional[datetime] = Query(None), after_id: Optional[int] = Query(None),
+              limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    return _rows_response(crud.get_news(db, limit=limit, after_ts=after_ts, after_id=after_id), schemas.NewsRead)
 
 @app.post("/news", response_model=schemas.NewsRead, status_code=201, summary="Create news (manual)")
 def create_news(n: schemas.NewsCreate, db: Session = Depends(get_db)):
@@ -77,9 +97,11 @@ def create_news(n: schemas.NewsCreate, db: Session = Depends(get_db)):
     return crud.create_news(db, n)
 
 @app.get("/events", response_model=List[schemas.EventRead], summary="List events")
-def list_events(issuer_id: Optional[int] = Query(None), skip: int = Query(0, ge=0),
-                limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
-    return crud.get_events(db, skip=skip, limit=limit, issuer_id=issuer_id)
+def list_events(issuer_id: Optional[int] = Query(None), after_ts: Optional[datetime] = Query(None),
+                after_id: Optional[int] = Query(None), limit: int = Query(100, ge=1, le=1000),
+                db: Session = Depends(get_db)):
+    _require_cursor_key(after_id, after_ts, "after_ts")
+    return _rows_response(crud.get_events(db, limit=limit, issuer_id=issuer_id, after_ts=after_ts, after_id=after_id), schemas.EventRead)
 
 @app.post("/events", response_model=schemas.EventRead, status_code=201, summary="Create event (manual)")
 def create_event(e: schemas.EventCreate, db: Session = Depends(get_db)):
@@ -91,11 +113,16 @@ def health():
 
 # --- Day 3: scoring endpoint ---
 @app.get("/score/{issuer_id}", summary="Get credit score + SHAP explainability")
-def get_score(issuer_id: int, db: Session = Depends(get_db)):
+def get_score(
+    issuer_id: int,
+    explain: bool = Query(False, description="include per-feature SHAP contributions"),
+    db: Session = Depends(get_db),
+):
     issuer = db.query(models.Issuer).filter(models.Issuer.id == issuer_id).first()
     if issuer is None:
         raise HTTPException(status_code=404, detail="issuer not found")
-    result = predict_and_explain(db, issuer_id)
+    # score-only by default (list/dashboard polling); SHAP only when asked for
+    result = predict_and_explain(db, issuer_id) if explain else predict_score(db, issuer_id)
     # minimal serialization
     return {
         "issuer": {
@@ -1,133 +1,207 @@
 """
 ML module: trains a LightGBM regressor on synthetic labels, saves model, and
-provides prediction + SHAP explainability.
+provides prediction + SHAP explainability (LightGBM's native TreeSHAP, pred_contrib).
 
 - train_model_if_needed(db): if model file missing, gather training data, synth labels, train, dump to models/lgbm_model.pkl
-- predict_and_explain(db, issuer_id): compute features, load model, return prediction and per-feature SHAP contributions.
+- predict_and_explain(db, issuer_id): read (cached) features, load model, return prediction and per-feature SHAP contributions.
+
+Inference runs on an lleaves build of the booster (compiled to native code via LLVM); the
+sklearn LGBMRegressor is only used for training and SHAP contributions.
 """
 
 import os
+import glob
+import hashlib
 import logging
+import threading
 from typing import Tuple, Dict, Any, List
 
 import joblib
+import lleaves
 import numpy as np
 import pandas as pd
 from lightgbm import LGBMRegressor
-import shap
 
 from .database import SessionLocal
-from .features import compute_features_for_issuer
+from .features import compute_features_for_many_issuers, get_cached_features
 
 MODEL_DIR = os.path.join(os.getcwd(), "models")
 MODEL_PATH = os.path.join(MODEL_DIR, "lgbm_model.pkl")
-EXPLAINER_PATH = os.path.join(MODEL_DIR, "shap_explainer.pkl")
+# lleaves inputs / builds are named lgbm_model-<hash>.txt / lleaves-<hash>.bin, <hash> being
+# that of the booster text, so a compiled binary is only ever loaded for the booster it came from
+BOOSTER_TXT_PATTERN = os.path.join(MODEL_DIR, "lgbm_model-{}.txt")
+LLEAVES_CACHE_PATTERN = os.path.join(MODEL_DIR, "lleaves-{}.bin")
+
+# Loaded model / lleaves build, kept for the life of the process and reloaded
+# only when MODEL_PATH's mtime changes (i.e. after a retrain). "compiled" is
+# (model, lleaves.Model) so a build is never served for a different model.
+_MODEL_CACHE = {"model": None, "feature_cols": None, "compiled": None, "mtime": 0.0}
+_MODEL_LOCK = threading.Lock()
+
+# one seeded Generator for all training-time randomness (label noise, augmentation)
+_rng = np.random.default_rng(42)
+
+FEATURE_COLS = ["debt_to_ebitda", "ebitda_margin", "revenue_growth", "avg_sentiment", "recent_revenue", "recent_total_debt"]
 
 logger = logging.getLogger(__name__)
 
 def _ensure_model_dir():
     os.makedirs(MODEL_DIR, exist_ok=True)
 
-def _synthesize_label_from_row(df_row: pd.Series) -> float:
+def _synthesize_labels_vec(df: pd.DataFrame) -> pd.Series:
     """
-    Heuristic label generation for training (synthetic):
+    Heuristic label generation for training (synthetic), one vectorized pass over all rows:
     credit_score_base = 600
     - penalty for high debt_to_ebitda
     + bonus for positive revenue growth and avg_sentiment and ebitda_margin
     Map final to range [300, 850].
     """
-    base = 600.0
-    debt_penalty = 100.0 * min(df_row.get("debt_to_ebitda", 0.0), 10.0) / 10.0  # 0..100
-    growth_bonus = 150.0 * max(min(df_row.get("revenue_growth", 1.0), 1.0), -1.0)  # can be negative
-    margin_bonus = 100.0 * max(min(df_row.get("ebitda_margin", 1.0), 1.0), -1.0)
-    sentiment_bonus = 100.0 * max(min(df_row.get("avg_sentiment", 1.0), 1.0), -1.0)
-    noise = np.random.normal(0, 25)
-    score = base - debt_penalty + growth_bonus + margin_bonus + sentiment_bonus + noise
+    debt_penalty = 100.0 * np.minimum(df["debt_to_ebitda"].to_numpy(dtype=np.float64), 10.0) / 10.0  # 0..100
+    growth_bonus = 150.0 * np.clip(df["revenue_growth"].to_numpy(dtype=np.float64), -1.0, 1.0)  # can be negative
+    margin_bonus = 100.0 * np.clip(df["ebitda_margin"].to_numpy(dtype=np.float64), -1.0, 1.0)
+    sentiment_bonus = 100.0 * np.clip(df["avg_sentiment"].to_numpy(dtype=np.float64), -1.0, 1.0)
+    noise = _rng.normal(0.0, 25.0, size=len(df))
+    score = 600.0 - debt_penalty + growth_bonus + margin_bonus + sentiment_bonus + noise
     # clamp
-    return float(max(300.0, min(850.0, score)))
+    return pd.Series(np.clip(score, 300.0, 850.0), index=df.index)
 
 def build_training_dataframe(db) -> pd.DataFrame:
     """
     Build a small DataFrame of features per issuer using current DB rows.
     If not enough data, we duplicate or perturb entries to create a modest dataset.
     """
-    issuers = db.query.__self__.query  # not used; better to query Issuer models via ORM
     # We'll import ORM models lazily to avoid circular imports
     from . import models
-    import math
 
-    rows = []
-    issuer_objs = db.query(models.Issuer).all()
-    for iss in issuer_objs:
-        feats = compute_features_for_issuer(db, iss.id)
-        feats["issuer_id"] = iss.id
-        feats["issuer_name"] = iss.name
-        rows.append(feats)
+    issuer_objs = db.query(models.Issuer.id).all()
+    # two queries for all issuers instead of two per issuer
+    feats_by_issuer = compute_features_for_many_issuers(db, [iss.id for iss in issuer_objs])
 
-    if len(rows) == 0:
+    if len(issuer_objs) == 0:
         # fallback: create two synthetic issuers
-        rows = [
-            {"issuer_id": 0, "debt_to_ebitda": 2.0, "ebitda_margin": 0.1, "revenue_growth": 0.05, "avg_sentiment": 0.1, "recent_revenue": 100.0, "recent_total_debt": 200.0},
-            {"issuer_id": 1, "debt_to_ebitda": 6.0, "ebitda_margin": 0.02, "revenue_growth": -0.1, "avg_sentiment": -0.2, "recent_revenue": 10.0, "recent_total_debt": 150.0},
-        ]
-    df = pd.DataFrame(rows)
+        ids = np.array([0, 1], dtype=np.int64)
+        cols = {
+            "debt_to_ebitda": np.array([2.0, 6.0]),
+            "ebitda_margin": np.array([0.1, 0.02]),
+            "revenue_growth": np.array([0.05, -0.1]),
+            "avg_sentiment": np.array([0.1, -0.2]),
+            "recent_revenue": np.array([100.0, 10.0]),
+            "recent_total_debt": np.array([200.0, 150.0]),
+        }
+    else:
+        # one float64 array per feature column, filled by index (no list of dicts for pandas to infer)
+        n = len(issuer_objs)
+        ids = np.empty(n, dtype=np.int64)
+        cols = {c: np.empty(n, dtype=np.float64) for c in FEATURE_COLS}
+        for i, iss in enumerate(issuer_objs):
+            feats = feats_by_issuer[iss.id]
+            ids[i] = iss.id
+            for c in FEATURE_COLS:
+                cols[c][i] = feats.get(c, 0.0)
+    df = pd.DataFrame({"issuer_id": ids, **cols})
     # If dataset too small, augment by adding small noise
     if len(df) < 8:
-        extra = []
-        for i in range(20):  # create ~20 rows by jittering
-            base = df.sample(n=1).iloc[0]
-            jitter = {
-                "issuer_id": int(base.get("issuer_id", 0)),
-                "debt_to_ebitda": max(0.0, float(base["debt_to_ebitda"]) * (1.0 + np.random.normal(0, 0.2))),
-                "ebitda_margin": float(base["ebitda_margin"]) * (1.0 + np.random.normal(0, 0.2)),
-                "revenue_growth": float(base["revenue_growth"]) * (1.0 + np.random.normal(0, 0.3)),
-                "avg_sentiment": float(base["avg_sentiment"]) + np.random.normal(0, 0.1),
-                "recent_revenue": float(base["recent_revenue"]) * (1.0 + np.random.normal(0, 0.2)),
-                "recent_total_debt": float(base["recent_total_debt"]) * (1.0 + np.random.normal(0, 0.2)),
-            }
-            extra.append(jitter)
-        df = pd.concat([df, pd.DataFrame(extra)], ignore_index=True)
-    return df
+        # create ~20 rows by jittering randomly drawn base rows, all at once
+        n_aug = 20
+        base = df.iloc[_rng.integers(0, len(df), size=n_aug)]
+        col = lambda c: base[c].to_numpy(dtype=np.float64)
+        # all jitter in one draw: column j is the noise for the j-th feature below
+        noise = _rng.normal(0.0, [0.2, 0.2, 0.3, 0.1, 0.2, 0.2], size=(n_aug, 6))
+        extra = pd.DataFrame({
+            "issuer_id": base["issuer_id"].to_numpy(dtype=np.int64),
+            "debt_to_ebitda": np.maximum(0.0, col("debt_to_ebitda") * (1.0 + noise[:, 0])),
+            "ebitda_margin": col("ebitda_margin") * (1.0 + noise[:, 1]),
+            "revenue_growth": col("revenue_growth") * (1.0 + noise[:, 2]),
+            "avg_sentiment": col("avg_sentiment") + noise[:, 3],
+            "recent_revenue": col("recent_revenue") * (1.0 + noise[:, 4]),
+            "recent_total_debt": col("recent_total_debt") * (1.0 + noise[:, 5]),
+        })
+        df = pd.concat([df, extra], ignore_index=True)
+    # float32 features / int32 ids: half the bytes for LightGBM to read while binning
+    return df.astype({"issuer_id": np.int32, **{c: np.float32 for c in FEATURE_COLS}})
 
 def train_and_save_model(db):
     _ensure_model_dir()
     logger.info("Building training dataframe...")
     df = build_training_dataframe(db)
-    feature_cols = ["debt_to_ebitda", "ebitda_margin", "revenue_growth", "avg_sentiment", "recent_revenue", "recent_total_debt"]
-    X = df[feature_cols].fillna(0.0).astype(float)
-    y = df.apply(_synthesize_label_from_row, axis=1).astype(float)
+    feature_cols = list(FEATURE_COLS)
+    X = df[feature_cols].fillna(0.0).astype(np.float32)
+    y = _synthesize_labels_vec(X)
 
     logger.info("Training LightGBM on %d examples...", len(X))
-    model = LGBMRegressor(n_estimators=200, learning_rate=0.05, max_depth=6, random_state=42)
-    model.fit(X, y)
+    # sized for a few dozen rows: single-threaded (OpenMP sync would dominate), shallow trees,
+    # and leaves allowed down to one sample so LightGBM can split at all
+    model = LGBMRegressor(
+        n_estimators=64, learning_rate=0.1, max_depth=3, num_leaves=7, min_child_samples=1,
+        n_jobs=1, verbose=-1, force_col_wise=True, random_state=42,
+    )
+    # plain contiguous arrays skip LightGBM's pandas conversion; names passed explicitly for the booster
+    model.fit(np.ascontiguousarray(X.to_numpy()), y.to_numpy(), feature_name=feature_cols)
 
     # Save model
     joblib.dump({"model": model, "feature_cols": feature_cols}, MODEL_PATH)
     logger.info("Saved LightGBM model to %s", MODEL_PATH)
+    _prune_lleaves_files(keep=_booster_digest(model.booster_.model_to_string()))
 
-    # Build a SHAP explainer (TreeExplainer) and save it (explainer + expected_value)
-    try:
-        explainer = shap.TreeExplainer(model)
-        # Note: saving full explainer can be large; but we save for convenience
-        joblib.dump({"explainer": explainer}, EXPLAINER_PATH)
-        logger.info("Saved SHAP explainer to %s", EXPLAINER_PATH)
-    except Exception as e:
-        logger.exception("Failed to build/save SHAP explainer: %s", e)
+def _booster_digest(booster_text: str) -> str:
+    return hashlib.sha256(booster_text.encode("utf-8")).hexdigest()[:16]
 
-def load_model_and_info():
-    if not os.path.exists(MODEL_PATH):
-        return None
-    obj = joblib.load(MODEL_PATH)
-    return obj  # dict with 'model' and 'feature_cols'
+def _prune_lleaves_files(keep: str):
+    """Best-effort removal of booster texts / lleaves builds of other models (and the old unhashed names)."""
+    keep_paths = {BOOSTER_TXT_PATTERN.format(keep), LLEAVES_CACHE_PATTERN.format(keep)}
+    stale = glob.glob(BOOSTER_TXT_PATTERN.format("*")) + glob.glob(LLEAVES_CACHE_PATTERN.format("*"))
+    stale += [os.path.join(MODEL_DIR, "lgbm_model.txt"), os.path.join(MODEL_DIR, "lleaves.bin")]
+    for path in stale:
+        if path not in keep_paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
 
-def load_explainer():
-    if not os.path.exists(EXPLAINER_PATH):
-        return None
+def load_compiled_model(model_obj):
+    """
+    lleaves model for model_obj's booster. Compiles on first call (or reuses the build cached
+    under the booster's hash) and keeps the result in _MODEL_CACHE until the model changes.
+    """
+    model = model_obj["model"]
+    entry = _MODEL_CACHE["compiled"]
+    if entry is None or entry[0] is not model:
+        with _MODEL_LOCK:
+            entry = _MODEL_CACHE["compiled"]
+            if entry is None or entry[0] is not model:
+                # booster text taken from the loaded model itself, never from a file another
+                # process may be rewriting; files are written under a temp name and renamed
+                booster_text = model.booster_.model_to_string()
+                digest = _booster_digest(booster_text)
+                txt_path = BOOSTER_TXT_PATTERN.format(digest)
+                bin_path = LLEAVES_CACHE_PATTERN.format(digest)
+                tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+                if not os.path.exists(txt_path):
+                    _ensure_model_dir()
+                    with open(txt_path + tmp_suffix, "w", encoding="utf-8") as f:
+                        f.write(booster_text)
+                    os.replace(txt_path + tmp_suffix, txt_path)
+                compiled = lleaves.Model(model_file=txt_path)
+                if os.path.exists(bin_path):
+                    compiled.compile(cache=bin_path)
+                else:
+                    compiled.compile(cache=bin_path + tmp_suffix)
+                    os.replace(bin_path + tmp_suffix, bin_path)
+                entry = _MODEL_CACHE["compiled"] = (model, compiled)
+    return entry[1]
+
+def load_model_and_info():
     try:
-        ex_obj = joblib.load(EXPLAINER_PATH)
-        return ex_obj.get("explainer")
-    except Exception:
+        mtime = os.stat(MODEL_PATH).st_mtime
+    except FileNotFoundError:
         return None
+    if _MODEL_CACHE["model"] is None or _MODEL_CACHE["mtime"] != mtime:
+        with _MODEL_LOCK:
+            if _MODEL_CACHE["model"] is None or _MODEL_CACHE["mtime"] != mtime:
+                obj = joblib.load(MODEL_PATH)
+                _MODEL_CACHE.update(model=obj["model"], feature_cols=obj["feature_cols"],
+                                    compiled=None, mtime=mtime)
+    return {"model": _MODEL_CACHE["model"], "feature_cols": _MODEL_CACHE["feature_cols"]}
 
 def train_model_if_needed(db):
     if not os.path.exists(MODEL_PATH):
@@ -136,51 +210,68 @@ def train_model_if_needed(db):
     else:
         logger.info("Model already exists at %s", MODEL_PATH)
 
-def predict_and_explain(db, issuer_id: int) -> Dict[str, Any]:
+def _predict(db, issuer_id: int):
     """
-    Returns dict:
-    {
-        "score": float,
-        "raw_score": float,
-        "features": {name: val, ...},
-        "shap": [{ "feature": name, "value": val, "shap_value": shap_val }, ...]
-    }
+    Shared scoring step: (model_obj, feats, X_arr, raw_pred) for one issuer,
+    training a model first if none exists.
     """
     model_obj = load_model_and_info()
     if model_obj is None:
         # fallback: train now
         train_and_save_model(db)
         model_obj = load_model_and_info()
-    model = model_obj["model"]
     feature_cols = model_obj["feature_cols"]
 
-    feats = compute_features_for_issuer(db, issuer_id)
-    X = pd.DataFrame([feats])[feature_cols].fillna(0.0).astype(float)
+    feats = get_cached_features(db, issuer_id)
+    # single row filled straight into a C-contiguous array; a one-row DataFrame costs more than the tree walk
+    X_arr = np.empty((1, len(feature_cols)), dtype=np.float64)
+    for i, c in enumerate(feature_cols):
+        v = feats.get(c, 0.0)
+        X_arr[0, i] = 0.0 if v is None or v != v else float(v)
+
+    compiled = load_compiled_model(model_obj)
+    raw_pred = float(compiled.predict(X_arr, n_jobs=1)[0])
+    return model_obj, feats, X_arr, raw_pred
 
-    raw_pred = model.predict(X)[0]
+def _clip_score(raw_pred: float) -> float:
     # map raw_pred to normalized score between 300..850 already in synth labels (so raw_pred is that)
-    score = float(max(300.0, min(850.0, raw_pred)))
+    return float(max(300.0, min(850.0, raw_pred)))
+
+def predict_score(db, issuer_id: int) -> Dict[str, Any]:
+    """
+    Score only (no SHAP work); same dict as predict_and_explain with "shap" left empty.
+    """
+    _, feats, _, raw_pred = _predict(db, issuer_id)
+    return {
+        "score": _clip_score(raw_pred),
+        "raw_score": raw_pred,
+        "features": feats,
+        "shap": []
+    }
+
+def predict_and_explain(db, issuer_id: int) -> Dict[str, Any]:
+    """
+    Returns dict:
+    {
+        "score": float,
+        "raw_score": float,
+        "features": {name: val, ...},
+        "shap": [{ "feature": name, "value": val, "shap_value": shap_val }, ...]
+    }
+    """
+    model_obj, feats, X_arr, raw_pred = _predict(db, issuer_id)
+    feature_cols = model_obj["feature_cols"]
 
-    # SHAP explanation
-    explainer = load_explainer()
-    shap_values = None
+    # SHAP explanation: LightGBM's built-in exact TreeSHAP in C++; returns (1, n_features + 1)
+    # with the expected value in the last column
     shap_list = []
     try:
-        if explainer is None:
-            explainer = shap.TreeExplainer(model)
-        # shap_values for single sample -> array shape (1, n_features) or list for multioutput
-        sv = explainer.shap_values(X)
-        # shap_values for regression is 1d array per feature
-        # shap returns array or list; normalize to 2D
-        if isinstance(sv, list):
-            # sometimes shap returns a list (one per output), pick first
-            sv = sv[0]
-        sv_arr = np.array(sv).reshape(1, -1)
+        contrib = model_obj["model"].booster_.predict(X_arr, pred_contrib=True)[0]
         for i, fname in enumerate(feature_cols):
             shap_list.append({
                 "feature": fname,
-                "value": float(X.iloc[0][fname]),
-                "shap_value": float(sv_arr[0, i])
+                "value": float(X_arr[0, i]),
+                "shap_value": float(contrib[i])
             })
     except Exception as e:
         logger.exception("SHAP explanation error: %s", e)
@@ -191,7 +282,7 @@ def predict_and_explain(db, issuer_id: int) -> Dict[str, Any]:
     shap_list_sorted = sorted(shap_list, key=lambda x: abs(x.get("shap_value", 0.0)), reverse=True)
 
     return {
-        "score": score,
+        "score": _clip_score(raw_pred),
         "raw_score": raw_pred,
         "features": feats,
         "shap": shap_list_sorted
@@ -1,10 +1,14 @@
 from sqlalchemy import (
-    Column, Integer, String, Date, Float, ForeignKey, DateTime, func, Boolean, Text
+    Column, Integer, String, Date, Float, ForeignKey, DateTime, func, Boolean, Text, Index, UniqueConstraint
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.types import JSON
+from datetime import datetime, timezone
 from .database import Base
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
 class Issuer(Base):
     __tablename__ = "issuers"
 
@@ -24,7 +28,9 @@ class Fundamental(Base):
     __tablename__ = "fundamentals"
 
     id = Column(Integer, primary_key=True, index=True)
-    issuer_id = Column(Integer, ForeignKey("issuers.id", ondelete="CASCADE"), nullable=False, index=True)
+    # covered by ix_fund_issuer_date below (issuer_id is its leading column)
+    issuer_id = Column(Integer, ForeignKey("issuers.id", ondelete="CASCADE"), nullable=False)
+    # unfiltered /fundamentals pages seek on report_date alone (ties go by id, the rowid)
     report_date = Column(Date, nullable=False, index=True)
     revenue = Column(Float, nullable=True)
     ebitda = Column(Float, nullable=True)
@@ -33,6 +39,11 @@ class Fundamental(Base):
 
     issuer = relationship("Issuer", back_populates="fundamentals")
 
+    # latest-N fundamentals per issuer (features) walk this index instead of sorting
+    __table_args__ = (
+        Index("ix_fund_issuer_date", issuer_id, report_date.desc()),
+    )
+
 class News(Base):
     __tablename__ = "news"
 
@@ -50,13 +61,43 @@ class Event(Base):
     __tablename__ = "events"
 
     id = Column(Integer, primary_key=True, index=True)
-    issuer_id = Column(Integer, ForeignKey("issuers.id", ondelete="SET NULL"), nullable=True, index=True)
+    # covered by ix_event_issuer_ts below (issuer_id is its leading column)
+    issuer_id = Column(Integer, ForeignKey("issuers.id", ondelete="SET NULL"), nullable=True)
     news_id = Column(Integer, ForeignKey("news.id", ondelete="SET NULL"), nullable=True, index=True)
     event_type = Column(String(128), nullable=False, index=True)  # e.g., earnings, merger, price, other
     description = Column(Text, nullable=True)
     sentiment = Column(Float, nullable=True)  # VADER compound score
-    timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # set in Python so every row is stored in the same format as bound datetimes (keyset cursors
+    # compare timestamps; SQLite's CURRENT_TIMESTAMP text has no microseconds and never equals one)
+    timestamp = Column(DateTime(timezone=True), default=_utcnow, server_default=func.now(), nullable=False)
     extra = Column(JSON, nullable=True)
+    # UTC day for event types deduped per day (price); NULL otherwise, and NULLs never conflict
+    bucket_day = Column(Date, nullable=True)
 
     issuer = relationship("Issuer", back_populates="events")
     news = relationship("News", back_populates="events")
+
+    # latest-N events per issuer (features, /events?issuer_id=) walk this index instead of sorting
+    __table_args__ = (
+        Index("ix_event_issuer_ts", issuer_id, timestamp.desc()),
+        # unfiltered /events pages (ORDER BY timestamp DESC, id DESC) seek here instead of sorting
+        Index("ix_event_ts_id", timestamp.desc(), id.desc()),
+        UniqueConstraint(issuer_id, event_type, bucket_day, name="uq_event_issuer_type_day"),
+    )
+
+class FeedCache(Base):
+    __tablename__ = "feed_cache"
+
+    # conditional-GET validators from the last successful fetch of each RSS feed
+    url = Column(String(2048), primary_key=True)
+    etag = Column(String(512), nullable=True)
+    modified = Column(String(128), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+class IssuerFeatureCache(Base):
+    __tablename__ = "issuer_feature_cache"
+
+    # latest compute_features_for_issuer() output, refreshed on ingest and read by /score
+    issuer_id = Column(Integer, ForeignKey("issuers.id", ondelete="CASCADE"), primary_key=True)
+    feats = Column(JSON, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
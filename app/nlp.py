@@ -1,8 +1,16 @@
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple
 import re
+import ahocorasick
 
-analyzer = SentimentIntensityAnalyzer()
+# built on first use (parses the bundled lexicon files); see _get_analyzer()
+analyzer: Optional[SentimentIntensityAnalyzer] = None
+
+def _get_analyzer() -> SentimentIntensityAnalyzer:
+    global analyzer
+    if analyzer is None:
+        analyzer = SentimentIntensityAnalyzer()
+    return analyzer
 
 # Very simple keyword-based event classification
 KEYWORDS = {
@@ -15,18 +23,55 @@ KEYWORDS = {
     # fallback: price-related events will be created by price ingestion
 }
 
+# All keywords compiled into one Aho-Corasick automaton: a single O(len(text)) pass finds
+# every keyword occurrence instead of one substring scan per keyword. Values are
+# (priority, etype) where priority is the category's position in KEYWORDS, so the
+# earliest-listed matching category still wins.
+def _build_keyword_automaton() -> ahocorasick.Automaton:
+    automaton = ahocorasick.Automaton()
+    for priority, (etype, kws) in enumerate(KEYWORDS.items()):
+        for kw in kws:
+            kw = kw.lower()
+            # a keyword listed under several categories keeps the earliest one
+            if not automaton.exists(kw):
+                automaton.add_word(kw, (priority, etype))
+    automaton.make_automaton()
+    return automaton
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
 def classify_event(text: str) -> str:
     t = (text or "").lower()
-    # quick tokenization
-    for etype, kws in KEYWORDS.items():
-        for kw in kws:
-            if kw in t:
-                return etype
-    return "other"
+    best = None
+    for _, hit in _KEYWORD_AUTOMATON.iter(t):
+        if best is None or hit < best:
+            best = hit
+            if best[0] == 0:
+                break
+    return best[1] if best else "other"
 
 def analyze_sentiment(text: str) -> float:
-    if not text:
+    # blank text can't hit the lexicon; anything else (digits, emoticons, emoji) may
+    if not text or text.isspace():
         return 0.0
-    vs = analyzer.polarity_scores(text)
+    vs = _get_analyzer().polarity_scores(text)
     # return compound score between -1..1
     return float(vs.get("compound", 0.0))
+
+def analyze_sentiment_batch(texts: List[str]) -> List[float]:
+    """
+    analyze_sentiment over a list, in order. The analyzer is looked up once and
+    repeated texts (same story from several feeds) are scored once.
+    """
+    sia = _get_analyzer()
+    seen: Dict[str, float] = {}
+    scores = []
+    for text in texts:
+        if not text or text.isspace():
+            scores.append(0.0)
+            continue
+        score = seen.get(text)
+        if score is None:
+            score = seen[text] = float(sia.polarity_scores(text).get("compound", 0.0))
+        scores.append(score)
+    return scores
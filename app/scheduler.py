@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from .ingestion import ingest_all
 from .database import SessionLocal
@@ -13,26 +14,34 @@ class IngestionScheduler:
     def __init__(self, interval_seconds: Optional[int] = None):
         self.interval = int(interval_seconds or os.getenv("INGEST_INTERVAL_SECONDS", 300))  # default 300s (5m)
         self._task: Optional[asyncio.Task] = None
+        self._stop_task: Optional[asyncio.Future] = None
         self._stop_event = asyncio.Event()
+        # ingestion is blocking DB + HTTP work; it runs on its own thread so the event loop keeps serving requests
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest")
+
+    def _run_ingest_once(self):
+        # create a DB session and run ingest_all
+        db = SessionLocal()
+        try:
+            return ingest_all(db)
+        finally:
+            db.close()
 
     async def _runner(self):
         logger.info("Scheduler started; interval=%ss", self.interval)
+        # one long-lived waiter on the stop event, shared by every tick
+        self._stop_task = asyncio.ensure_future(self._stop_event.wait())
         while not self._stop_event.is_set():
             try:
-                # create a DB session and run ingest_all
-                db = SessionLocal()
-                try:
-                    counts = ingest_all(db)
-                    logger.info("Ingestion run counts: %s", counts)
-                finally:
-                    db.close()
+                loop = asyncio.get_running_loop()
+                counts = await loop.run_in_executor(self._executor, self._run_ingest_once)
+                logger.info("Ingestion run counts: %s", counts)
             except Exception as e:
                 logger.exception("Error during scheduled ingestion: %s", e)
             # wait for interval or stop event
-            try:
-                await asyncio.wait_for(self._stop_event.wait(), timeout=self.interval)
-            except asyncio.TimeoutError:
-                continue
+            done, _ = await asyncio.wait({self._stop_task}, timeout=self.interval)
+            if done:
+                break
         logger.info("Scheduler stopped")
 
     def start(self):
@@ -45,5 +54,7 @@ class IngestionScheduler:
         self._stop_event.set()
         if self._task:
             await self._task
+        if self._stop_task and not self._stop_task.done():
+            self._stop_task.cancel()
 
 scheduler = IngestionScheduler()
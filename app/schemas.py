@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import date, datetime
 from typing import Optional, List, Any
 
@@ -12,8 +12,7 @@ class IssuerCreate(IssuerBase): pass
 
 class IssuerRead(IssuerBase):
     id: int
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, extra="ignore")
 
 class FundamentalBase(BaseModel):
     issuer_id: int
@@ -27,8 +26,7 @@ class FundamentalCreate(FundamentalBase): pass
 class FundamentalRead(FundamentalBase):
     id: int
     created_at: datetime
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, extra="ignore")
 
 # ---- NEWS ----
 class NewsBase(BaseModel):
@@ -43,8 +41,7 @@ class NewsRead(NewsBase):
     id: int
     created_at: datetime
     processed: bool
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, extra="ignore")
 
 # ---- EVENT ----
 class EventBase(BaseModel):
@@ -60,5 +57,4 @@ class EventCreate(EventBase): pass
 
 class EventRead(EventBase):
     id: int
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, extra="ignore")
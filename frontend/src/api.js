@@ -17,8 +17,8 @@ export async function fetchFundamentals(issuer_id) {
   return res.data;
 }
 
-export async function fetchScore(issuer_id) {
-  const res = await api.get(`/score/${issuer_id}`);
+export async function fetchScore(issuer_id, explain = false) {
+  const res = await api.get(`/score/${issuer_id}`, { params: explain ? { explain: 1 } : {} });
   return res.data;
 }
 
@@ -43,7 +43,7 @@ export default function IssuerDetail() {
       try {
         const [funds, scoreRes, evts, allNews] = await Promise.all([
           fetchFundamentals(issuerId),
-          fetchScore(issuerId).catch(() => null),
+          fetchScore(issuerId, true).catch(() => null),
           fetchEvents(issuerId).catch(() => []),
           fetchNews().catch(() => [])
         ]);